@@ -0,0 +1,86 @@
+"""Regression tests for locating and rewriting the version in a pyproject.toml.
+
+Run with `python -m unittest discover tests` from the repository root.
+"""
+
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+# The hook is a script with a dash in its name, so it is loaded from its path
+_spec = importlib.util.spec_from_file_location("version_bump", Path(__file__).parent.parent / "version-bump.py")
+version_bump = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(version_bump)
+
+
+def located_version(content: str) -> str | None:
+    match = version_bump.find_version_line(content)
+    return match.group("version") if match else None
+
+
+class FindVersionLineTest(unittest.TestCase):
+    def test_project_table(self):
+        self.assertEqual(located_version('[project]\nname = "a"\nversion = "1.2.3"\n'), "1.2.3")
+
+    def test_poetry_table(self):
+        self.assertEqual(located_version("[tool.poetry]\nversion = '2.0.0'\n"), "2.0.0")
+
+    def test_dotted_keys(self):
+        self.assertEqual(located_version('project.version = "1.0.0"\n'), "1.0.0")
+        self.assertEqual(located_version('[tool]\npoetry.version = "3.0.0"\n'), "3.0.0")
+
+    def test_other_tables_ignored(self):
+        content = '[tool.black]\nversion = "9.9.9"\n[project]\nversion = "1.2.3"\n'
+        self.assertEqual(located_version(content), "1.2.3")
+        self.assertIsNone(located_version('[tool.black]\nversion = "9.9.9"\n'))
+
+    def test_project_preferred_over_poetry(self):
+        content = '[tool.poetry]\nversion = "9.9.9"\n\n[project]\nversion = "1.2.3"\n'
+        self.assertEqual(located_version(content), "1.2.3")
+
+    def test_header_inside_multiline_string(self):
+        content = '[project]\ndescription = """\n[fake]\nversion = "0.0.0"\n"""\nversion = "1.2.3"\n'
+        match = version_bump.find_version_line(content)
+        self.assertEqual(match.group("version"), "1.2.3")
+        self.assertEqual(content[match.start("version"):match.end("version")], "1.2.3")
+
+
+class PyprojectDocTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "pyproject.toml"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_bump_rewrites_only_the_version(self):
+        content = '# comment\n[project]\nname = "a"  # keep\nversion = "0.1.0"\n\n[tool.x]\nversion = "5"\n'
+        self.path.write_text(content)
+        self.assertEqual(version_bump.update_pyproject_version(self.path, version_bump.increment_patch_version), ("0.1.0", "0.1.1"))
+        self.assertEqual(self.path.read_text(), content.replace('"0.1.0"', '"0.1.1"'))
+
+    def test_refuses_when_scan_disagrees_with_parser(self):
+        # The nested array's `["x"]` line looks like a table header to the scan
+        content = '[project]\nclassifiers = [\n  ["x"],\n]\nversion = "1.0.0"\n'
+        self.path.write_text(content)
+        doc = version_bump.PyprojectDoc.load(self.path)
+        self.assertEqual(doc.version, "1.0.0")
+        with self.assertRaises(ValueError):
+            doc.version = "1.0.1"
+        self.assertEqual(self.path.read_text(), content)
+
+    def test_refuses_version_that_breaks_the_file(self):
+        self.path.write_text('[project]\nversion = "1.0.0"\n')
+        doc = version_bump.PyprojectDoc.load(self.path)
+        with self.assertRaises(ValueError):
+            doc.version = 'a"b'
+
+    def test_blob_version(self):
+        self.assertEqual(version_bump.extract_version_from_blob(b'[tool.poetry]\nversion = "9.9.9"\n[project]\nversion = "1.2.3"\n'), "1.2.3")
+        self.assertIsNone(version_bump.extract_version_from_blob(b"[project]\nversion = \n"))
+        self.assertIsNone(version_bump.extract_version_from_blob(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
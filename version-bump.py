@@ -3,37 +3,86 @@
 Pre-commit hook for automatic version bumping in UV workspace.
 
 This script:
-1. Scans the repository for all `pyproject.toml` files to identify potential packages.
-2. Filters out the root project and any specified ignored directories.
-3. Analyzes git diff to identify changed packages among the remaining candidates.
+1. Analyzes git diff to find the changed files.
+2. Walks up from each changed file to find the packages (directories with a `pyproject.toml`) containing it.
+3. Filters out the root project and any specified ignored directories.
 4. Checks if versions have been manually updated.
 5. Auto-bumps patch version for packages with changes but no version bump.
 6. Bumps root version if any subpackages were bumped (unless disabled).
 """
 
 import argparse
+import os
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Set, Tuple
+from typing import Callable, Dict, List, Set, Tuple
 
-import tomlkit
 
+# Patterns are compiled once at import instead of on every call
+# A `version = "..."` line, optionally written as a dotted key such as `project.version`
+_VERSION_LINE_RE = re.compile(
+    r'(?m)^(\s*(?P<keys>(?:[A-Za-z0-9_-]+\s*\.\s*)*)version\s*=\s*["\'])(?P<version>[^"\']+)(["\'])'
+)
+_SECTION_HEADER_RE = re.compile(r"(?m)^\s*\[([^\]]+)\]")
+# Multi-line strings, whose lines may look like table headers or version keys
+_MULTILINE_STRING_RE = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'')
 
-def run_git_command(cmd: List[str]) -> str:
-    """Run a git command and return the output."""
+
+def run_git_command(cmd: List[str], input: bytes | None = None) -> bytes:
+    """Run a git command (feeding it `input` on stdin, if given) and return its raw output.
+
+    Output is left undecoded; callers decode only the parts they use.
+    """
     try:
         result = subprocess.run(
-            cmd, capture_output=True, text=True, check=True, cwd=Path.cwd()
+            cmd, input=input, capture_output=True, check=True
         )
-        return result.stdout.strip()
+        return result.stdout
     except subprocess.CalledProcessError as e:
         print(f"Git command failed: {' '.join(cmd)}")
-        print(f"Error: {e.stderr}")
+        print(f"Error: {e.stderr.decode(errors='replace')}")
         sys.exit(1) # Exit if git command fails, crucial for pre-commit
 
 
+def read_blobs(refs: List[str]) -> List[bytes | None]:
+    """Return the contents of each ref (e.g. `HEAD:path/to/pyproject.toml`), or None if git can't resolve it.
+
+    All refs are known up front, so they are sent to a single `git cat-file --batch` in
+    one go and the objects are parsed from its output, instead of one `git show` per file.
+    """
+    output = run_git_command(
+        ["git", "cat-file", "--batch"], input=b"".join(os.fsencode(ref) + b"\n" for ref in refs)
+    )
+    blobs = []
+    pos = 0
+    for _ in refs:
+        # Header is `<sha> <type> <size>`, or `<ref> missing` / `<ref> ambiguous`
+        header_end = output.find(b"\n", pos)
+        header = output[pos:header_end].split() if header_end != -1 else []
+        if not header:
+            print("Git command failed: git cat-file --batch ended before answering every ref")
+            sys.exit(1)
+        pos = header_end + 1
+        if header[-1] in (b"missing", b"ambiguous"):
+            blobs.append(None)
+            continue
+        _, object_type, size = header
+        end = pos + int(size)
+        if output[end:end + 1] != b"\n": # Trailing LF after each object
+            print("Git command failed: git cat-file --batch returned a truncated object")
+            sys.exit(1)
+        blobs.append(output[pos:end] if object_type == b"blob" else None)
+        pos = end + 1
+    return blobs
+
+
 def get_changed_files(
     commit_before: str | None,
     commit_after: str | None
@@ -48,91 +97,77 @@ def get_changed_files(
             print(f"Diffing against empty tree for initial commit/new branch: {commit_after}")
             # This gets all files in the commit_after (the current commit)
             # git diff-tree --no-commit-id --name-only -r <commit_sha>
-            output = run_git_command(["git", "diff-tree", "--no-commit-id", "--name-only", "-r", commit_after])
+            output = run_git_command(["git", "diff-tree", "--no-commit-id", "--name-only", "-z", "-r", commit_after])
         else:
             print(f"Diffing between commits: {commit_before} and {commit_after}")
-            output = run_git_command(["git", "diff", "--name-only", commit_before, commit_after])
+            output = run_git_command(["git", "diff", "--name-only", "-z", commit_before, commit_after])
     else:
         print("Defaulting to staged files (git diff --cached --name-only)")
-        output = run_git_command(["git", "diff", "--cached", "--name-only"])
-    return set(output.split("\n")) if output else set()
+        output = run_git_command(["git", "diff", "--cached", "--name-only", "-z"])
+    # -z separates paths with NUL, so names containing newlines or quotes come through verbatim
+    return {os.fsdecode(path) for path in output.split(b"\0") if path}
 
 
 def get_changed_packages(
     staged_files: Set[str],
-    ignore_dirs_patterns_str: List[str],
-    root_pyproject_path_obj: Path
+    ignore_dirs_patterns: List[re.Pattern],
+    root_pyproject_path_obj: Path,
+    repo_root: Path
 ) -> Set[Path]:
     """
     Identify package directories that have staged changes.
 
-    1. Finds all `pyproject.toml` files in the current working directory.
-    2. Excludes the root `pyproject.toml`'s directory.
-    3. Excludes directories specified in `ignore_dirs_patterns_str`.
-    4. For the remaining, checks if any staged files are within them.
+    1. Walks up from every staged file through its parent directories.
+    2. Treats each directory containing a `pyproject.toml` as a package.
+    3. Excludes the root `pyproject.toml`'s directory.
+    4. Excludes directories matching any of `ignore_dirs_patterns`.
+    Only directories on the path of a staged file are ever looked at, so the cost
+    doesn't grow with the size of the repository.
     Returns a set of relative paths to changed package directories.
     """
     changed_pkgs_set = set()
-    repo_root = Path.cwd()
 
-    # Resolve root pyproject path for reliable comparison
-    abs_root_package_dir = root_pyproject_path_obj.parent.resolve()
+    # Resolve the root project's directory once for reliable comparison. Path.cwd() is
+    # already a resolved path, so the candidates below need no resolve() of their own.
+    try:
+        root_package_dir_rel = root_pyproject_path_obj.parent.resolve().relative_to(repo_root)
+    except ValueError: # Root project lives outside the repository, so it can't shadow a package
+        root_package_dir_rel = None
     
-    # Compile ignore regex patterns
-    compiled_ignore_patterns = []
-    for pattern_str in ignore_dirs_patterns_str: # Renamed from ignore_package_dirs
-        try:
-            compiled_ignore_patterns.append(re.compile(pattern_str))
-        except re.error as e:
-            print(f"⚠️ Invalid regex pattern in --ignore-dirs: '{pattern_str}'. Error: {e}. Skipping this pattern.")
-            continue
-
-    for pyproject_file in repo_root.rglob("pyproject.toml"):
-        package_dir_abs = pyproject_file.parent.resolve()
-
-        # Skip if it's the root project's directory
-        if package_dir_abs == abs_root_package_dir:
-            continue
+    def find_package(dir_parts: Tuple[str, ...]) -> Path | None:
+        """Return the directory as a package path if it is a (non-ignored) package, else None."""
+        package_dir_rel = Path(*dir_parts)
 
-        # Convert to relative path for regex matching and reporting
-        try:
-            package_dir_rel = package_dir_abs.relative_to(repo_root)
-        except ValueError:
-            print(f"⚠️ Could not make path relative for {package_dir_abs}, skipping.")
-            continue
+        # Skip if it's the root project's directory or holds no pyproject.toml
+        if package_dir_rel == root_package_dir_rel:
+            return None
+        if not (repo_root / package_dir_rel / "pyproject.toml").is_file():
+            return None
 
         # Skip if it matches any ignore regex pattern
-        ignored_by_regex = False
-        for pattern in compiled_ignore_patterns:
+        for pattern in ignore_dirs_patterns:
             # Use search to find the pattern anywhere in the relative path string
-            # Paths are converted to strings and use forward slashes on all platforms by Path objects
-            if pattern.search(str(package_dir_rel).replace('\\', '/')):
+            # Git paths use forward slashes on all platforms
+            if pattern.search("/".join(dir_parts)):
                 print(f"🚫 Ignoring directory '{package_dir_rel}' as it matches ignore pattern: '{pattern.pattern}'.")
-                ignored_by_regex = True
-                break
-        if ignored_by_regex:
-            continue
-        
-        # Check if any staged file is within this package directory
-        for staged_file_str in staged_files:
-            staged_file_path = Path(staged_file_str)
-            # Ensure staged_file_path is relative to repo_root for is_relative_to to work as expected
-            # Path.is_relative_to needs both paths to be absolute or both relative to the same root.
-            # Staged files from git are usually relative to repo root.
-            try:
-                # Path.is_relative_to() works correctly if staged_file_path is relative
-                # and package_dir_abs is absolute, by making staged_file_path absolute first.
-                # However, to be explicit and safe with various path states:
-                if staged_file_path.resolve().is_relative_to(package_dir_abs):
-                    changed_pkgs_set.add(package_dir_rel)
-                    # print(f"Found change in {package_dir_rel} due to {staged_file_str}") # Debug
-                    break  # Found a change in this package, move to next pyproject.toml
-            except ValueError: # Not relative
-                continue
-            except Exception as e: # other potential errors like file not existing if resolve fails
-                print(f"Error checking staged file {staged_file_str} against {package_dir_abs}: {e}")
-                continue
-                
+                return None
+        return package_dir_rel
+
+    # Walk up from each staged file. Files share most of their parent directories, so
+    # every directory is checked once and remembered, whether or not it is a package.
+    # Git reports paths relative to the repo root with forward slashes, so plain string
+    # splitting is enough here.
+    package_for_dir: Dict[Tuple[str, ...], Path | None] = {}
+    for staged_file_str in staged_files:
+        parts = tuple(staged_file_str.split("/"))
+        for depth in range(1, len(parts)):
+            dir_parts = parts[:depth]
+            if dir_parts not in package_for_dir:
+                package_for_dir[dir_parts] = find_package(dir_parts)
+            package_dir_rel = package_for_dir[dir_parts]
+            if package_dir_rel is not None:
+                changed_pkgs_set.add(package_dir_rel)
+
     return changed_pkgs_set
 
 
@@ -154,115 +189,312 @@ def increment_patch_version(version_str: str) -> str:
     return f"{major}.{minor}.{patch + 1}"
 
 
-def get_version_from_pyproject(pyproject_path: Path) -> str:
-    """Extract version from pyproject.toml using tomlkit."""
-    try:
-        with open(pyproject_path, "r") as f:
-            content = f.read()
-        data = tomlkit.parse(content)
-        
-        project_data = data.get("project")
-        if project_data and "version" in project_data:
-            return str(project_data["version"]) # Ensure it's a string
-        
-        tool_data = data.get("tool")
-        if tool_data and "poetry" in tool_data and "version" in tool_data["poetry"]:
-            return str(tool_data["poetry"]["version"]) # Ensure it's a string
-            
-        print(f"Warning: Could not find version in {pyproject_path} under [project] or [tool.poetry]")
+def find_version_line(content: str) -> re.Match | None:
+    """Locate the version line of the [project] or [tool.poetry] table, for rewriting it in place.
+
+    Handles both `version = "..."` under the table header and dotted keys such as
+    `project.version = "..."`, and prefers [project] when both tables have a version.
+    The "version" group of the returned match is the version string itself, and its
+    span indexes into `content`. This is a scan, not a parser: PyprojectDoc checks what
+    it finds against tomllib before anything is written.
+    """
+    # Blank out multi-line strings, keeping every offset, so their lines aren't taken for headers or keys
+    masked = _MULTILINE_STRING_RE.sub(lambda m: re.sub(r"[^\n]", " ", m.group()), content)
+
+    # Headers and version lines are both walked forward once, so the text is scanned in a single pass
+    headers = _SECTION_HEADER_RE.finditer(masked)
+    next_header = next(headers, None)
+    section = ""
+    poetry_match = None
+    for match in _VERSION_LINE_RE.finditer(masked):
+        while next_header and next_header.start() < match.start():
+            section = next_header.group(1)
+            next_header = next(headers, None)
+        # Full name of the table the key lives in, e.g. `[tool]` + `poetry.version` -> "tool.poetry"
+        table_name = "".join(f"{section}.{match.group('keys')}".split()).strip(".")
+        if table_name == "project":
+            return match
+        if table_name == "tool.poetry" and poetry_match is None:
+            poetry_match = match
+    return poetry_match
+
+
+def _version_table(data: dict) -> dict | None:
+    """The table of parsed pyproject data holding its version: [project], else [tool.poetry]."""
+    tool = data.get("tool")
+    for table in (data.get("project"), tool.get("poetry") if isinstance(tool, dict) else None):
+        if isinstance(table, dict) and isinstance(table.get("version"), str):
+            return table
+    return None
+
+
+def extract_version_from_blob(blob: bytes | None) -> str | None:
+    """Extract the version string from raw pyproject.toml contents (e.g. a HEAD blob)."""
+    if not blob:
         return None
-    except (FileNotFoundError, tomlkit.exceptions.ParseError) as e: # Updated exception type
-        print(f"Error reading or parsing version from {pyproject_path}: {e}")
+    try:
+        table = _version_table(tomllib.loads(blob.decode("utf-8")))
+    except (UnicodeDecodeError, tomllib.TOMLDecodeError):
         return None
+    return table["version"] if table else None
 
 
-def set_version_in_pyproject(pyproject_path: Path, new_version: str) -> bool:
-    """Update version in pyproject.toml using tomlkit to preserve formatting."""
+def write_file_atomic(file_path: Path, data: bytes) -> None:
+    """Write a file through a temporary sibling and os.replace, so it is never left half-written.
+
+    The data is fsync'ed before the rename, so even a crash or a killed commit leaves
+    either the old or the new contents on disk. A symlinked file is written through to
+    its target, as a plain write would, rather than replacing the link itself.
+    """
+    target = file_path.resolve()
+    tmp_file = tempfile.NamedTemporaryFile(
+        mode="wb", dir=target.parent, prefix=f".{target.name}.", delete=False
+    )
     try:
-        with open(pyproject_path, "r") as f:
-            content = f.read()
-        
-        data = tomlkit.parse(content)
-        updated = False
-
-        # Try to update [project.version]
-        if "project" in data and "version" in data["project"]:
-            # Ensure we are replacing a string item, not creating a new table if it was malformed
-            if isinstance(data["project"]["version"], str) or isinstance(data["project"]["version"], tomlkit.items.String):
-                current_version = str(data["project"]["version"])
-                if current_version != new_version:
-                    data["project"]["version"] = new_version
-                    updated = True
-            else:
-                print(f"Warning: 'project.version' in {pyproject_path} is not a string. Skipping update here.")
-
-        # Else, try to update [tool.poetry.version] (only if project.version wasn't found/updated)
-        elif "tool" in data and "poetry" in data["tool"] and "version" in data["tool"]["poetry"]:
-             # Ensure we are replacing a string item
-            if isinstance(data["tool"]["poetry"]["version"], str) or isinstance(data["tool"]["poetry"]["version"], tomlkit.items.String):
-                current_version = str(data["tool"]["poetry"]["version"])
-                if current_version != new_version:
-                    data["tool"]["poetry"]["version"] = new_version
-                    updated = True
-            else:
-                print(f"Warning: 'tool.poetry.version' in {pyproject_path} is not a string. Skipping update here.")
-        else:
-            print(f"Error: 'version' field not found under [project] or [tool.poetry] in {pyproject_path}. Cannot update.")
-            return False
+        with tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        shutil.copymode(target, tmp_file.name) # Temporary files are created as 0600
+        os.replace(tmp_file.name, target)
+    except BaseException:
+        os.unlink(tmp_file.name)
+        raise
+
+
+class PyprojectDoc:
+    """A pyproject.toml read and parsed once, exposing its version for reading and bumping.
+
+    tomllib decides what the version is; find_version_line only locates it in the text.
+    Setting `version` splices the new string into that spot and re-parses the result,
+    which must differ from the original in the version alone, so a misplaced edit is
+    refused rather than written. `save()` writes the text back only if it changed, so
+    the rest of the file stays byte-for-byte intact.
+    """
+
+    def __init__(self, path: Path, content: str) -> None:
+        self.path = path
+        self._content = content
+        self._dirty = False
+        self._data = tomllib.loads(content)
+        table = _version_table(self._data)
+        self._version = table["version"] if table else None
+        match = find_version_line(content)
+        self._span = match.span("version") if match and match.group("version") == self._version else None
+
+    @classmethod
+    def load(cls, path: Path) -> "PyprojectDoc":
+        return cls(path, path.read_bytes().decode("utf-8"))
+
+    @property
+    def version(self) -> str | None:
+        return self._version
+
+    @version.setter
+    def version(self, new_version: str) -> None:
+        if self._span is None:
+            raise ValueError(f"could not locate the version line in {self.path} to rewrite it")
+        start, end = self._span
+        new_content = self._content[:start] + new_version + self._content[end:]
+        try:
+            new_data = tomllib.loads(new_content)
+        except tomllib.TOMLDecodeError:
+            new_data = {}
+        # Everything but the version must parse exactly as before
+        table = _version_table(new_data)
+        if table is None or table["version"] != new_version:
+            raise ValueError(f"refusing to write version {new_version!r} into {self.path}")
+        table["version"] = self._version
+        if new_data != self._data:
+            raise ValueError(f"refusing to write version {new_version!r} into {self.path}")
+        table["version"] = new_version
+
+        self._content = new_content
+        self._data = new_data
+        self._span = (start, start + len(new_version))
+        self._dirty = self._dirty or new_version != self._version
+        self._version = new_version
+
+    def save(self) -> None:
+        if self._dirty:
+            write_file_atomic(self.path, self._content.encode("utf-8"))
+            self._dirty = False
+
+
+def update_pyproject_version(
+    pyproject_path: Path,
+    new_version_fn: Callable[[str], str]
+) -> Tuple[str, str]:
+    """Replace the version in pyproject.toml with `new_version_fn(current_version)`.
+
+    Returns (old_version, new_version). Errors are raised rather than printed, since this
+    runs in worker threads: OSError/UnicodeDecodeError/TOMLDecodeError for an unreadable,
+    unparsable or unwritable file, ValueError for a missing or non-semantic version.
+    """
+    doc = PyprojectDoc.load(pyproject_path)
+    current_version = doc.version
+    if current_version is None:
+        raise ValueError("'version' field not found under [project] or [tool.poetry]")
 
-        if updated:
-            with open(pyproject_path, "w") as f:
-                f.write(tomlkit.dumps(data))
-            return True
-        return False # No update was made (e.g. version was already the new_version)
+    doc.version = new_version_fn(current_version)
+    doc.save()
+    return current_version, doc.version
 
-    except (FileNotFoundError, tomlkit.exceptions.ParseError) as e: # Updated exception type
-        print(f"Error reading, parsing, or writing {pyproject_path}: {e}")
-        return False
-    except Exception as e: # Catch other potential errors
-        print(f"An unexpected error occurred while setting version in {pyproject_path}: {e}")
+
+def stage_files(file_paths: List[str]) -> bool:
+    """Stage all files with a single git add."""
+    if not file_paths:
+        return True
+    try:
+        subprocess.run(["git", "add", "--", *file_paths], capture_output=True, text=True, check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        # git names the path it rejected in quotes, e.g. "pathspec 'x' did not match any files"
+        rejected = [file_path for file_path in file_paths if f"'{file_path}'" in e.stderr]
+        print(f"⚠️  Failed to stage {', '.join(rejected or file_paths)}")
+        print(f"Error: {e.stderr.strip()}")
         return False
 
 
-def get_version_from_diff(pyproject_path: str) -> str | None:
-    """Check if the version line has changed in the staged diff."""
+@dataclass
+class VersionInfo:
+    """Versions of one pyproject.toml at HEAD and in the index (i.e. staged).
 
-    # Get the staged diff for this file
-    try:
-        diff_output = run_git_command(
-            ["git", "diff", "--cached", "--unified=0", pyproject_path]
+    Either is None when the file (or its version) doesn't exist there, e.g. `head` for a
+    new package, or when the file wasn't looked up because it isn't staged at all.
+    """
+
+    head: str | None = None
+    staged: str | None = None
+
+    @property
+    def manually_bumped(self) -> bool:
+        """Whether the user already staged a version change (or a version for a new file)."""
+        return self.staged is not None and self.staged != self.head
+
+
+def get_version_infos(staged_pyprojects: List[str]) -> Dict[str, VersionInfo]:
+    """Collect the HEAD and staged versions of every staged pyproject.toml in one pass.
+
+    Both copies of each file are read straight from git's object store through one
+    `git cat-file` process (`HEAD:<path>` and the index entry `:<path>`), so there is
+    no diff to generate or parse.
+    """
+    refs = [ref for path in staged_pyprojects for ref in (f"HEAD:{path}", f":{path}")]
+    blobs = read_blobs(refs)
+    return {
+        path: VersionInfo(head=extract_version_from_blob(head_blob), staged=extract_version_from_blob(index_blob))
+        for path, head_blob, index_blob in zip(staged_pyprojects, blobs[0::2], blobs[1::2])
+    }
+
+
+# Messages for each BumpResult.action, for sub-packages and for the root project
+_PACKAGE_MESSAGES = {
+    "missing": "⚠️  No pyproject.toml found for package: {name} (at {path}) - this should not happen.",
+    "manual": "✅ Version for {name} was manually changed and staged: {old} → {new}. Skipping auto-bump.",
+    "new": "✅ New package {name} has staged version: {new}. Skipping auto-bump.",
+    "bumped": "🔄 Bumped {name}: {old} → {new}",
+    "failed": "⚠️  Failed to update version for {name}",
+}
+_ROOT_MESSAGES = {
+    "missing": "❌ Root pyproject.toml not found at {name}. Skipping root bump.",
+    "manual": "✅ Root version ({name}) was manually changed and staged: {old} → {new}. Skipping auto-bump for root.",
+    "new": "✅ New root pyproject ({name}) has staged version: {new}. Skipping auto-bump for root.",
+    "bumped": "🔄 Bumped root version ({name}): {old} → {new}",
+    "failed": "⚠️  Failed to update root version at {name}",
+    "outside": "⚠️  Root pyproject.toml ({name}) is outside the repository, so a bump could not be committed. Skipping root bump.",
+}
+
+
+@dataclass
+class BumpResult:
+    """Outcome of checking a single changed package (or the root project)."""
+
+    display_name: str
+    pyproject_path: Path
+    is_root: bool = False
+    # One of "bumped", "manual" (version changed by the user and staged), "new" (package
+    # not in HEAD with a staged version), "missing" (no pyproject.toml), "failed", or
+    # "outside" (a root pyproject.toml outside the repository, which is left alone)
+    action: str = "failed"
+    old_version: str | None = None
+    new_version: str | None = None
+    # Why a "failed" bump failed, printed along with the message
+    detail: str | None = None
+
+    @property
+    def handled(self) -> bool:
+        """Whether the version is bumped now, either by the hook or manually by the user."""
+        return self.action in ("manual", "new", "bumped")
+
+    @property
+    def message(self) -> str:
+        """Human readable summary of what happened."""
+        messages = _ROOT_MESSAGES if self.is_root else _PACKAGE_MESSAGES
+        return messages[self.action].format(
+            name=self.display_name, path=self.pyproject_path, old=self.old_version, new=self.new_version
         )
 
-        # Look for version changes in the diff
-        version_pattern = r"\+version\s*=\s*[\"']([^\"']+)[\"']"
-        match = re.search(version_pattern, diff_output)
-        if match:
-            return match.group(1)
-        return None
-    except Exception:
-        return None
 
+def process_package(
+    pyproject_path: Path,
+    display_name: str,
+    versions: VersionInfo,
+    is_root: bool = False
+) -> BumpResult:
+    """Respect a manual version bump for a changed package, or auto-bump its patch version.
+
+    Used for the root project too (`is_root=True`). Only touches the given pyproject.toml,
+    so packages can be processed concurrently.
+    """
+    result = BumpResult(display_name=display_name, pyproject_path=pyproject_path, is_root=is_root)
+
+    # This check should be redundant if get_changed_packages ensures pyproject.toml exists
+    # but keeping it as a safeguard
+    if not pyproject_path.exists():
+        result.action = "missing"
+        return result
+
+    if versions.manually_bumped:
+        result.action = "manual" if versions.head else "new"
+        result.old_version, result.new_version = versions.head, versions.staged
+        return result
 
-def stage_file(file_path: str) -> bool:
-    """Stage a file with git add."""
     try:
-        subprocess.run(["git", "add", file_path], check=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+        result.old_version, result.new_version = update_pyproject_version(pyproject_path, increment_patch_version)
+        result.action = "bumped"
+    except (OSError, UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+        result.detail = f"Error reading, parsing, or writing {pyproject_path}: {e}"
+    except ValueError as e: # No version field, or a non-semantic version
+        result.detail = f"Could not compute new version for {pyproject_path}: {e}"
+    return result
 
 
-def main() -> int:
-    """Main function for the version bump hook."""
-    print("🔍 Checking for version bumps in changed packages...")
+def _compile_regex(pattern_str: str) -> re.Pattern:
+    """Compile an --ignore-dirs or --ignore-files pattern at parse time, so a bad one is reported right away."""
+    try:
+        return re.compile(pattern_str)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"invalid regex pattern '{pattern_str}': {e}") from e
+
 
+def parse_args() -> argparse.Namespace:
+    """Parse the hook's command line arguments."""
     parser = argparse.ArgumentParser(description="UV Workspace Version Bump Pre-commit Hook")
     parser.add_argument(
         "--ignore-dirs", # Renamed from --ignore-package-dirs
         nargs="+",
+        type=_compile_regex,
         default=[],
         help="List of regex patterns for directory paths to ignore (e.g., 'tests/fixtures', '_build/'). Default: []",
     )
+    parser.add_argument(
+        "--ignore-files",
+        nargs="+",
+        type=_compile_regex,
+        default=[],
+        help="List of regex patterns for changed file paths that don't warrant a version bump (e.g., '\\.md$', '^docs/'). Default: []",
+    )
     parser.add_argument(
         "--root-pyproject-path",
         default="pyproject.toml",
@@ -285,8 +517,16 @@ def main() -> int:
         default=None,
         help="The commit SHA after changes (for GitHub Action context)."
     )
-    args = parser.parse_args()
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main function for the version bump hook."""
+    print("🔍 Checking for version bumps in changed packages...")
+
+    args = parse_args()
 
+    repo_root = Path.cwd() # Hooks run from the repository root; git subprocesses inherit it
     root_pyproject_path_obj = Path(args.root_pyproject_path)
     if not root_pyproject_path_obj.exists():
         print(f"❌ Root pyproject.toml not found at {args.root_pyproject_path}. Exiting.")
@@ -300,120 +540,90 @@ def main() -> int:
         print("No changed files found.")
         return 0
 
-    changed_packages_all = get_changed_packages(changed_file_paths, args.ignore_dirs, root_pyproject_path_obj)
-    if not changed_packages_all:
-        print("No package changes detected in scanned project directories (after filtering).")
-        return 0
-        
-    changed_packages = changed_packages_all # Use the direct result
+    # Files such as docs or READMEs can be excluded up front; if nothing else changed, no
+    # package is looked at and git is never called again.
+    bump_file_paths = changed_file_paths
+    if args.ignore_files:
+        bump_file_paths = {path for path in changed_file_paths if not any(p.search(path) for p in args.ignore_files)}
+        if len(bump_file_paths) < len(changed_file_paths):
+            print(f"🚫 Ignoring {len(changed_file_paths) - len(bump_file_paths)} changed file(s) matching --ignore-files.")
 
+    changed_packages = get_changed_packages(bump_file_paths, args.ignore_dirs, root_pyproject_path_obj, repo_root)
     if not changed_packages:
-        print("No package changes detected after filtering ignored packages.") # This message might be redundant now
+        print("No package changes detected in scanned project directories (after filtering).")
         return 0
-        
-    print(f"📦 Changed packages (after filtering): {', '.join(sorted(str(p) for p in changed_packages))}")
 
-    packages_bumped = [] # Stores display names of packages handled (bumped or acknowledged manual bump)
-    
-    # Check each changed package
-    for package_path_rel in sorted(list(changed_packages)): # Iterate in a defined order
-        package_display_name = str(package_path_rel) 
-        pyproject_path = package_path_rel / "pyproject.toml" # This is now a relative path object
-
-        # This check should be redundant if get_changed_packages ensures pyproject.toml exists
-        # but keeping it as a safeguard
-        if not pyproject_path.exists(): 
-            print(f"⚠️  No pyproject.toml found for package: {package_display_name} (at {pyproject_path}) - this should not happen.")
-            continue
-
-        current_version_str = get_version_from_pyproject(pyproject_path)
-        diff_version_str = get_version_from_diff(str(pyproject_path))
-        
-        if current_version_str is None:
-            print(f"⚠️  Could not read current version for {package_display_name}. Skipping.")
-            continue
+    ordered_packages = sorted(changed_packages, key=str) # Sorted once; everything below follows this order
+    print(f"📦 Changed packages (after filtering): {', '.join(str(p) for p in ordered_packages)}")
 
-        original_version = None
-        try:
-            # Construct relative path to pyproject.toml from CWD for git show
-            git_show_path = str(pyproject_path) # Already relative from get_changed_packages
-            original_version_content = run_git_command(["git", "show", f"HEAD:{git_show_path}"])
-            if original_version_content:
-                match = re.search(r'version\s*=\s*["\']([^"\']+)["\']', original_version_content)
-                if match:
-                    original_version = match.group(1)
-        except Exception as e:
-            print(f"Could not get HEAD version for {package_display_name}: {e}")
-
-
-        if str(pyproject_path) in changed_file_paths and diff_version_str is not None:
-            if original_version and diff_version_str != original_version:
-                 print(f"✅ Version for {package_display_name} was manually changed and staged: {original_version} → {diff_version_str}. Skipping auto-bump.")
-                 packages_bumped.append(package_display_name) 
-                 continue
-            elif not original_version and diff_version_str: 
-                 print(f"✅ New package {package_display_name} has staged version: {diff_version_str}. Skipping auto-bump.")
-                 packages_bumped.append(package_display_name)
-                 continue
-
-        new_version = increment_patch_version(current_version_str)
-
-        if set_version_in_pyproject(pyproject_path, new_version):
-            print(f"🔄 Bumped {package_display_name}: {current_version_str} → {new_version}")
-
-            if stage_file(str(pyproject_path)):
-                packages_bumped.append(package_display_name)
-            else:
-                print(f"⚠️  Failed to stage {pyproject_path}")
+    # Only a staged pyproject.toml can carry a manual version bump, so only those need their
+    # HEAD and staged contents. Unstaged ones are bumped straight from the working tree.
+    # The HEAD:<path> lookup needs the root's path relative to the repository. repo_root is
+    # already resolved, so resolve the root too (e.g. an absolute path through a symlinked
+    # checkout). A root outside the repository can't be committed, so it is never bumped.
+    try:
+        git_show_root_path = root_pyproject_path_obj.resolve().relative_to(repo_root).as_posix()
+    except ValueError:
+        git_show_root_path = None
+    candidate_paths = [str(p / "pyproject.toml") for p in changed_packages] + [git_show_root_path]
+    staged_pyprojects = [p for p in candidate_paths if p in changed_file_paths]
+    version_infos = get_version_infos(staged_pyprojects) if staged_pyprojects else {}
+
+    packages_bumped = [] # Display names of packages handled (bumped or acknowledged manual bump), in sorted order
+    to_stage: List[str] = [] # pyproject.toml files rewritten by the hook, staged together at the end
+    
+    # Check each changed package. The work per package is file and pipe I/O on distinct
+    # files, so packages are processed in parallel; results come back in input order.
+    with ThreadPoolExecutor(max_workers=min(8, len(ordered_packages))) as executor:
+        results = list(executor.map(
+            lambda package_path_rel: process_package(
+                package_path_rel / "pyproject.toml",
+                str(package_path_rel),
+                version_infos.get(str(package_path_rel / "pyproject.toml"), VersionInfo()),
+            ),
+            ordered_packages,
+        ))
+
+    # If any packages were bumped (or acknowledged), also bump the root version. This has to
+    # wait for the packages' results, but otherwise goes through the same steps.
+    if any(result.handled for result in results) and not args.dont_bump_root:
+        if git_show_root_path is None:
+            results.append(BumpResult(
+                display_name=args.root_pyproject_path,
+                pyproject_path=root_pyproject_path_obj,
+                is_root=True,
+                action="outside",
+            ))
         else:
-            print(f"⚠️  Failed to update version for {package_display_name}")
-
-    # If any packages were bumped (or acknowledged), also bump the root version
-    if packages_bumped and not args.dont_bump_root:
-        # root_pyproject_path_obj is already defined from args
-        if root_pyproject_path_obj.exists(): # Should exist due to check at start
-            current_root_version_str = get_version_from_pyproject(root_pyproject_path_obj)
-            staged_root_version_str = get_version_from_diff(str(root_pyproject_path_obj))
-
-            original_root_version = None
-            try:
-                # Ensure path is relative to CWD for git show
-                git_show_root_path = str(root_pyproject_path_obj.relative_to(Path.cwd())) if root_pyproject_path_obj.is_absolute() else str(root_pyproject_path_obj)
-                original_root_version_content = run_git_command(["git", "show", f"HEAD:{git_show_root_path}"])
-                if original_root_version_content:
-                    match = re.search(r'version\s*=\s*["\']([^"\']+)["\']', original_root_version_content)
-                    if match:
-                        original_root_version = match.group(1)
-            except Exception as e:
-                 print(f"Could not get HEAD version for root pyproject {args.root_pyproject_path}: {e}")
-
-
-            user_manually_bumped_root = False
-            if str(root_pyproject_path_obj) in changed_file_paths and staged_root_version_str is not None:
-                if original_root_version and staged_root_version_str != original_root_version:
-                    print(f"✅ Root version ({args.root_pyproject_path}) was manually changed and staged: {original_root_version} → {staged_root_version_str}. Skipping auto-bump for root.")
-                    user_manually_bumped_root = True
-                elif not original_root_version and staged_root_version_str:
-                     print(f"✅ New root pyproject ({args.root_pyproject_path}) has staged version: {staged_root_version_str}. Skipping auto-bump for root.")
-                     user_manually_bumped_root = True
-            
-            if not user_manually_bumped_root:
-                if current_root_version_str:
-                    new_root_version = increment_patch_version(current_root_version_str)
-                    if set_version_in_pyproject(root_pyproject_path_obj, new_root_version):
-                        print(
-                            f"🔄 Bumped root version ({args.root_pyproject_path}): {current_root_version_str} → {new_root_version}"
-                        )
-                        if not stage_file(str(root_pyproject_path_obj)):
-                            print(f"⚠️  Failed to stage {args.root_pyproject_path}")
-                    else:
-                        print(f"⚠️  Failed to update root version at {args.root_pyproject_path}")
-                elif not current_root_version_str : # Only print if not manually handled and no current version
-                     print(f"⚠️  Could not read current root version from {args.root_pyproject_path}. Skipping root bump.")
-
+            results.append(process_package(
+                root_pyproject_path_obj,
+                args.root_pyproject_path,
+                version_infos.get(git_show_root_path, VersionInfo()),
+                is_root=True,
+            ))
+
+    # Printed only here, in order, never from the worker threads
+    for result in results:
+        if result.detail:
+            print(result.detail)
+        print(result.message)
+        if result.action == "bumped":
+            to_stage.append(str(result.pyproject_path))
+            # A symlinked pyproject.toml is rewritten at its target, so that is staged too
+            target = result.pyproject_path.resolve()
+            if target.is_relative_to(repo_root) and target.relative_to(repo_root) != result.pyproject_path:
+                to_stage.append(target.relative_to(repo_root).as_posix())
+        if result.handled and not result.is_root:
+            packages_bumped.append(result.display_name)
+
+    # The files are already rewritten, so a failed git add must fail the hook; otherwise
+    # the commit would go ahead without the bumped versions.
+    if not stage_files(to_stage):
+        print("❌ Bumped pyproject.toml files could not be staged. Stage them with `git add` and commit again.")
+        return 1
 
     if packages_bumped:
-        print(f"✨ Version processing completed. Touched/acknowledged packages: {', '.join(sorted(packages_bumped))}")
+        print(f"✨ Version processing completed. Touched/acknowledged packages: {', '.join(packages_bumped)}")
     else:
         print("No version bumps were needed.")
 